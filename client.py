@@ -1,36 +1,182 @@
 import asyncio
-import json
+import atexit
+import functools
+import io
+import logging
 import os
-from typing import Optional, Union, Dict
+import queue
+import re
+from typing import Optional, Callable, Awaitable
 from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 import datetime
+import time
 
+import orjson
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 
-from anthropic import Anthropic
+from aioconsole import ainput
+from anthropic import AsyncAnthropic, DefaultAioHttpClient
 from dotenv import load_dotenv
 
 load_dotenv()  # load environment variables from .env
 
+logger = logging.getLogger(__name__)
+
+def setup_logging(level: int = logging.INFO) -> QueueListener:
+    """Configure root logging to write records from a background thread
+
+    Records are handed to a QueueListener, so the event loop never blocks on log I/O.
+    """
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(QueueHandler(log_queue))
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+def _json_default(obj):
+    """Serialize SDK content blocks (pydantic models) stored in the conversation history"""
+    if hasattr(obj, 'model_dump'):
+        return obj.model_dump(exclude_none=True)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+# Common install locations for uv, with the bare name as a fallback to PATH
+_UV_PATHS = [
+    '/usr/local/bin/uv',
+    '/opt/homebrew/bin/uv',
+    os.path.expanduser('~/.cargo/bin/uv'),
+    'uv'
+]
+
+@functools.lru_cache(maxsize=None)
+def _load_config(config_path: str) -> tuple[str, str, dict, dict]:
+    """Parse a config file and resolve its server launch settings once
+
+    Args:
+        config_path: Path to the JSON config file
+
+    Returns:
+        Tuple of (server_name, resolved_command, server_config, env)
+    """
+    config = orjson.loads(Path(config_path).read_bytes())
+
+    if 'mcpServers' not in config:
+        raise ValueError("Config file must contain 'mcpServers' object")
+
+    # For now, we'll just use the first server in the config
+    server_name, server_config = next(iter(config['mcpServers'].items()))
+
+    command = server_config['command']
+    if command == 'uv':
+        for uv_path in _UV_PATHS:
+            if os.path.exists(uv_path):
+                command = uv_path
+                break
+
+    env = {
+        **os.environ,  # Include current environment variables
+        **server_config.get('env', {})  # Override with config-specific variables
+    }
+    return server_name, command, server_config, env
+
+class QueryAborted(Exception):
+    """Raised by an on_text callback to stop a query whose output has nowhere to go"""
+
+@dataclass(slots=True)
+class _ErrorResult:
+    """Stands in for a tool result when the tool call failed"""
+    content: str
+
+def _content_chars(content) -> int:
+    """Approximate the size of a message's content in characters"""
+    if isinstance(content, str):
+        return len(content)
+    total = 0
+    for block in content:
+        if isinstance(block, dict):
+            value = block.get('text') or block.get('content') or block.get('input')
+        else:
+            value = getattr(block, 'text', None) or getattr(block, 'input', None)
+        total += len(value) if isinstance(value, str) else len(str(value or ''))
+    return total
+
+def _is_user_query(message: dict) -> bool:
+    """Whether a history message is a user query, i.e. the start of a turn"""
+    return message["role"] == "user" and isinstance(message["content"], str)
+
+# Matches transitional text like "Let me check..." that is left out of the final output
+_TRANSITIONAL_RE = re.compile(r"\s*(let me|i'?ll|i will|now i'?ll|next i'?ll)\b", re.IGNORECASE)
+
+class ConversationContext:
+    """Conversation history for one chat, kept apart from the MCP session it runs on"""
+    MAX_HISTORY_CHARS = 100_000  # roughly 25k tokens
+
+    def __init__(self, history: Optional[list] = None):
+        self.history = history if history is not None else []
+
+    @property
+    def history(self) -> list:
+        return self._history
+
+    @history.setter
+    def history(self, history: list):
+        self._history = history
+        self._history_chars = sum(_content_chars(message["content"]) for message in history)
+
+    def append(self, message: dict):
+        """Append a message to the history, keeping the size total current"""
+        self._history.append(message)
+        self._history_chars += _content_chars(message["content"])
+
+    def trim(self, max_chars: int = MAX_HISTORY_CHARS):
+        """Drop the oldest complete turns until the history fits in max_chars
+
+        A turn runs from one user query to the next, so tool_use/tool_result pairs
+        are never split. The most recent turn is always kept.
+        """
+        history = self._history
+        while self._history_chars > max_chars:
+            end = next((i for i in range(1, len(history)) if _is_user_query(history[i])), None)
+            if end is None:
+                break
+            for message in history[:end]:
+                self._history_chars -= _content_chars(message["content"])
+            del history[:end]
+
 class MCPClient:
+    MAX_RETRIES = 3
+    RETRY_DELAY = 1  # seconds
+
+    # Current-date system block, sent uncached after the static system prompt
+    _DATE_TEMPLATE = """The current date and time is: {now}
+NEVER ASSUME YOU KNOW THE DATE OR OTHER REAL TIME INFORMATION. ALWAYS USE THE PROVIDED CURRENT DATE: {now} AS YOUR REFERENCE POINT."""
+    _last_now_ts = 0.0
+    _last_now_str = ""
+    _date_prompt = ""
+
     def __init__(self):
         # Initialize session and client objects
         self.session: Optional[ClientSession] = None
         self.exit_stack = AsyncExitStack()
-        self.anthropic = Anthropic()
-        self.config: Optional[Dict] = None
-        self.conversation_history: list = []  # Store conversation history
+        self.anthropic = AsyncAnthropic(http_client=DefaultAioHttpClient())
+        self.context = ConversationContext()  # Default conversation, used by the CLI
+        self._tools_cache: Optional[list] = None  # Tool definitions formatted for Claude
+        self._mcp_tools: list = []  # Tool objects as returned by the server
+        self._prompts_cache: Optional[list] = None  # Prompts advertised by the server
+        self._prompts_by_name: dict = {}  # Same prompts, indexed by name
         
-        # Get current date and time
-        current_datetime = datetime.datetime.now()
-        formatted_date = current_datetime.strftime("%Y-%m-%d %H:%M:%S")
-        
-        # System prompt to guide Claude's behavior
-        self.system_prompt = f"""You are a sophisticated AI assistant with access to MCP (Model Context Protocol) servers that provide you with powerful tools to help users.
-
-The current date and time is: {formatted_date}
+        # System prompt to guide Claude's behavior. It is static so it can be prompt-cached;
+        # the current date goes in a separate, uncached block.
+        self.system_prompt = """You are a sophisticated AI assistant with access to MCP (Model Context Protocol) servers that provide you with powerful tools to help users.
 
 Key responsibilities:
 1. Tool Usage:
@@ -58,9 +204,27 @@ Key responsibilities:
    - Alert users to any required setup or prerequisites
 
 Remember: You have real-time access to the tools' latest descriptions and schemas. Always check these before making tool calls to ensure accuracy and optimal usage.
-NEVER ASSUME YOU KNOW THE DATE OR OTHER REAL TIME INFORMATION. ALWAYS USE THE PROVIDED CURRENT DATE: {formatted_date} AS YOUR REFERENCE POINT.
 Also when users ask about a website, always assume they are referring to the website's name, not ID, unless they specifically give you the ID"""
 
+    @classmethod
+    def _current_date_prompt(cls) -> str:
+        """Return the current-date system block, refreshing the timestamp at most once per second"""
+        now = time.time()
+        if now - cls._last_now_ts > 1.0:
+            cls._last_now_ts = now
+            cls._last_now_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+            cls._date_prompt = cls._DATE_TEMPLATE.format(now=cls._last_now_str)
+        return cls._date_prompt
+
+    @property
+    def conversation_history(self) -> list:
+        """History of the client's default conversation"""
+        return self.context.history
+
+    @conversation_history.setter
+    def conversation_history(self, history: list):
+        self.context.history = history
+
     async def connect_to_server(self, path: str):
         """Connect to an MCP server
 
@@ -78,43 +242,14 @@ Also when users ask about a website, always assume they are referring to the web
         Args:
             config_path: Path to the JSON config file
         """
-        with open(config_path, 'r') as f:
-            self.config = json.load(f)
-
-        if 'mcpServers' not in self.config:
-            raise ValueError("Config file must contain 'mcpServers' object")
-
-        # For now, we'll just use the first server in the config
-        server_name, server_config = next(iter(self.config['mcpServers'].items()))
-        
-        # Get environment variables from config if they exist
-        env_vars = server_config.get('env', {})
-        
-        # Try to find uv in common locations
-        uv_paths = [
-            '/usr/local/bin/uv',
-            '/opt/homebrew/bin/uv',
-            os.path.expanduser('~/.cargo/bin/uv'),
-            'uv'  # fallback to PATH
-        ]
-        
-        command = server_config['command']
-        if command == 'uv':
-            for uv_path in uv_paths:
-                if os.path.exists(uv_path):
-                    command = uv_path
-                    break
-            
+        server_name, command, server_config, env = _load_config(config_path)
         server_params = StdioServerParameters(
             command=command,
             args=server_config['args'],
-            env={
-                **os.environ,  # Include current environment variables
-                **env_vars     # Override with config-specific variables
-            }
+            env=env
         )
 
-        print(f"\nStarting server with command: {command} {' '.join(server_config['args'])}")
+        logger.info("Starting server with command: %s %s", command, ' '.join(server_config['args']))
         
         try:
             # Use the high-level SDK interface with proper context managers
@@ -126,20 +261,14 @@ Also when users ask about a website, always assume they are referring to the web
             await self.session.initialize()
             
             # List available tools
-            tools_response = await self.session.list_tools()
-            print(f"\nConnected to server '{server_name}' with tools:", [tool.name for tool in tools_response.tools])
+            await self.refresh_tools()
+            logger.info("Connected to server '%s' with tools: %s", server_name, [tool["name"] for tool in self._tools_cache])
             
             # Try to list available prompts
-            try:
-                prompts_result = await self.session.list_prompts()
-                # Access the prompts attribute of the result
-                prompts = prompts_result.prompts if hasattr(prompts_result, 'prompts') else []
-                print(f"Available prompts: {[getattr(prompt, 'name', str(prompt)) for prompt in prompts]}")
-            except Exception as e:
-                print(f"Server does not support prompts: {str(e)}")
+            await self.refresh_prompts()
                 
         except FileNotFoundError as e:
-            raise FileNotFoundError(f"Could not find the '{command}' executable. Please ensure uv is installed and in your PATH. Common install locations: {', '.join(uv_paths)}") from e
+            raise FileNotFoundError(f"Could not find the '{command}' executable. Please ensure uv is installed and in your PATH. Common install locations: {', '.join(_UV_PATHS)}") from e
         except Exception as e:
             raise Exception(f"Failed to connect to server: {str(e)}") from e
 
@@ -170,176 +299,245 @@ Also when users ask about a website, always assume they are referring to the web
         await self.session.initialize()
         
         # List available tools
-        tools_response = await self.session.list_tools()
-        print("\nConnected to server with tools:", [tool.name for tool in tools_response.tools])
+        await self.refresh_tools()
+        logger.info("Connected to server with tools: %s", [tool["name"] for tool in self._tools_cache])
         
         # Try to list available prompts
+        await self.refresh_prompts()
+
+    async def refresh_prompts(self) -> list:
+        """Fetch the prompt list from the server and update the cached prompts"""
         try:
             prompts_result = await self.session.list_prompts()
             # Access the prompts attribute of the result
             prompts = prompts_result.prompts if hasattr(prompts_result, 'prompts') else []
-            print(f"Available prompts: {[getattr(prompt, 'name', str(prompt)) for prompt in prompts]}")
+            logger.info("Available prompts: %s", [getattr(prompt, 'name', str(prompt)) for prompt in prompts])
         except Exception as e:
-            print(f"Server does not support prompts: {str(e)}")
+            prompts = []
+            logger.info("Server does not support prompts: %s", e)
+
+        self._prompts_cache = prompts
+        self._prompts_by_name = {getattr(prompt, 'name', str(prompt)): prompt for prompt in prompts}
+        return prompts
+
+    async def refresh_tools(self) -> list:
+        """Fetch the tool list from the server and update the cached tool definitions"""
+        for attempt in range(self.MAX_RETRIES):
+            try:
+                tools_resp = await self.session.list_tools()
+                break
+            except Exception as e:
+                if attempt == self.MAX_RETRIES - 1:
+                    raise Exception(f"Failed to get tools after {self.MAX_RETRIES} attempts: {str(e)}")
+                logger.warning("Retrying tool list retrieval (attempt %d/%d)...", attempt + 2, self.MAX_RETRIES)
+                await asyncio.sleep(self.RETRY_DELAY)
+
+        self._mcp_tools = tools_resp.tools
+        self._tools_cache = [{
+            "name": tool.name,
+            "description": tool.description,
+            "input_schema": tool.inputSchema
+        } for tool in tools_resp.tools]
+        if self._tools_cache:
+            # Cache breakpoint on the last tool so the tool definitions are prompt-cached
+            self._tools_cache[-1]["cache_control"] = {"type": "ephemeral"}
+        return self._tools_cache
+
+    async def process_query(self, query: str, on_text: Optional[Callable[[str], Awaitable[None]]] = None,
+                            context: Optional[ConversationContext] = None) -> str:
+        """Process a query using Claude and available tools
 
-    async def process_query(self, query: str) -> str:
-        """Process a query using Claude and available tools"""
-        MAX_RETRIES = 3
-        RETRY_DELAY = 1  # seconds
+        Args:
+            query: The user's query
+            on_text: Optional coroutine called with each text delta as Claude streams it
+            context: Conversation to continue; defaults to the client's own conversation
+        """
+        if context is None:
+            context = self.context
 
         # Add user's query to conversation history
-        self.conversation_history.append({
+        context.append({
             "role": "user",
             "content": query
         })
+        context.trim()
 
-        # Get available tools with retry
-        for attempt in range(MAX_RETRIES):
-            try:
-                response = await self.session.list_tools()
-                available_tools = [{
-                    "name": tool.name,
-                    "description": tool.description,
-                    "input_schema": tool.inputSchema
-                } for tool in response.tools]
-                break
-            except Exception as e:
-                if attempt == MAX_RETRIES - 1:
-                    raise Exception(f"Failed to get tools after {MAX_RETRIES} attempts: {str(e)}")
-                print(f"\nRetrying tool list retrieval (attempt {attempt + 2}/{MAX_RETRIES})...")
-                await asyncio.sleep(RETRY_DELAY)
+        # Tool definitions are cached at connect time; refresh_tools() updates them
+        available_tools = self._tools_cache
+        if available_tools is None:
+            available_tools = await self.refresh_tools()
 
-        final_text = []
+        # Final output is formatted as it is built: lines after a step marker are indented
+        buf = io.StringIO()
+        current_step = False
         step_count = 1
 
         while True:
+            tool_tasks = []
             try:
-                # Get Claude's next action
-                response = self.anthropic.messages.create(
+                # Stream Claude's next action, forwarding text as it arrives
+                async with self.anthropic.messages.stream(
                     model="claude-3-5-sonnet-latest",
                     max_tokens=2000,
-                    messages=self.conversation_history,
+                    system=[
+                        {"type": "text", "text": self.system_prompt, "cache_control": {"type": "ephemeral"}},
+                        {"type": "text", "text": self._current_date_prompt()}
+                    ],
+                    messages=context.history,
                     tools=available_tools
-                )
+                ) as stream:
+                    async for event in stream:
+                        if event.type == 'text' and on_text is not None:
+                            await on_text(event.text)
+                        elif event.type == 'content_block_stop' and event.content_block.type == 'tool_use':
+                            # Start the tool as soon as its input is complete
+                            block = event.content_block
+                            tool_tasks.append((block, asyncio.create_task(
+                                self._call_tool_with_retry(block.name, block.input)
+                            )))
+                    response = await stream.get_final_message()
             except Exception as e:
+                for _, task in tool_tasks:
+                    task.cancel()
+                if isinstance(e, QueryAborted):
+                    raise
                 error_msg = f"Error calling Claude API: {str(e)}"
-                self.conversation_history.append({
+                context.append({
                     "role": "assistant",
                     "content": error_msg
                 })
                 return error_msg
 
+            # Wait for all tool calls to finish; they run concurrently
+            results = await asyncio.gather(*(task for _, task in tool_tasks), return_exceptions=True)
+            tool_results = {block.id: result for (block, _), result in zip(tool_tasks, results)}
+
             # Process the response
             assistant_message_content = []
+            tool_result_content = []
             has_tool_calls = False
 
             for content in response.content:
                 if content.type == 'text':
                     # Only add text if it's not just a transitional message
-                    if not (content.text.strip().lower().startswith(("let me", "i'll", "i will", "now i'll", "next i'll"))):
-                        final_text.append(content.text)
+                    if not _TRANSITIONAL_RE.match(content.text):
+                        buf.write("  " + content.text if current_step else content.text)
+                        buf.write("\n")
                     assistant_message_content.append({"type": "text", "text": content.text})
                 elif content.type == 'tool_use':
                     has_tool_calls = True
                     tool_name = content.name
-                    tool_args = content.input
-                    
+
                     # Add a step marker for tool calls
-                    final_text.append(f"\nStep {step_count}: Using {tool_name}")
+                    buf.write(f"\nStep {step_count}: Using {tool_name}\n")
+                    current_step = True
                     step_count += 1
 
-                    # Execute tool call with retry
-                    for attempt in range(MAX_RETRIES):
-                        try:
-                            result = await self.session.call_tool(tool_name, tool_args)
-                            break
-                        except Exception as e:
-                            if attempt == MAX_RETRIES - 1:
-                                error_msg = f"Tool call failed after {MAX_RETRIES} attempts: {str(e)}"
-                                final_text.append(f"  Error: {error_msg}")
-                                result = type('ToolResult', (), {'content': error_msg})()
-                            else:
-                                print(f"\nRetrying tool call (attempt {attempt + 2}/{MAX_RETRIES})...")
-                                await asyncio.sleep(RETRY_DELAY)
+                    result = tool_results[content.id]
+                    if isinstance(result, BaseException):
+                        error_msg = str(result)
+                        buf.write(f"    Error: {error_msg}\n")
+                        result = _ErrorResult(error_msg)
 
                     # Add tool call to message content
                     assistant_message_content.append(content)
-                    
-                    # Add assistant's tool use to conversation history
-                    self.conversation_history.append({
-                        "role": "assistant",
-                        "content": assistant_message_content
-                    })
+
+                    # Handle TextContent objects by extracting their text
+                    if hasattr(result.content, 'text'):
+                        result_content = result.content.text
+                    else:
+                        # Collect text items in one pass, bailing out on the first non-text item
+                        parts = None
+                        if isinstance(result.content, list):
+                            parts = []
+                            for item in result.content:
+                                text = getattr(item, 'text', None)
+                                if text is None:
+                                    parts = None
+                                    break
+                                parts.append(text)
+                        result_content = "\n".join(parts) if parts is not None else str(result.content)
 
                     # Debug logging for tool result
-                    print("\nDEBUG - Raw tool result:")
-                    try:
-                        # Handle TextContent objects by extracting their text
-                        if hasattr(result.content, 'text'):
-                            result_content = result.content.text
-                        elif isinstance(result.content, list) and all(hasattr(item, 'text') for item in result.content):
-                            result_content = "\n".join(item.text for item in result.content)
-                        else:
-                            result_content = str(result.content)
-                        print(json.dumps(result_content, indent=2))
-                    except Exception as e:
-                        print(f"Debug logging failed: {str(e)}")
-                    print("\nDEBUG - Tool result type:", type(result.content))
-                    
-                    # Add tool result to conversation history with proper text extraction
-                    self.conversation_history.append({
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "tool_result",
-                                "tool_use_id": content.id,
-                                "content": result_content  # Now just passing the string directly
-                            }
-                        ]
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Raw tool result (%d chars)", len(result_content))
+                        logger.debug("Tool result type: %s", type(result.content))
+
+                    tool_result_content.append({
+                        "type": "tool_result",
+                        "tool_use_id": content.id,
+                        "content": result_content  # Now just passing the string directly
                     })
 
-            # If no tool calls were made, we're done
-            if not has_tool_calls:
+            if has_tool_calls:
+                # Add assistant's tool use and the matching tool results to conversation history
+                context.append({
+                    "role": "assistant",
+                    "content": assistant_message_content
+                })
+                context.append({
+                    "role": "user",
+                    "content": tool_result_content
+                })
+                context.trim()
+            else:
+                # No tool calls were made, so this is the final assistant response
+                context.append({
+                    "role": "assistant",
+                    "content": response.content
+                })
                 break
 
-        # Add final assistant response to conversation history
-        if not has_tool_calls:
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": response.content
-            })
-
-        # Format the final output
-        formatted_output = []
-        current_step = None
-        
-        for line in final_text:
-            if line.startswith("\nStep "):
-                current_step = line.strip()
-                formatted_output.append(f"\n{current_step}")
-            elif current_step:
-                formatted_output.append(f"  {line}")
-            else:
-                formatted_output.append(line)
+        return buf.getvalue()
 
-        return "\n".join(formatted_output)
+    async def _call_tool_with_retry(self, name: str, args: dict):
+        """Call an MCP tool, retrying failed attempts
 
-    def save_conversation(self, filename: str):
-        """Save the current conversation history to a file"""
+        Args:
+            name: Name of the tool to call
+            args: Arguments to pass to the tool
+        """
+        for attempt in range(self.MAX_RETRIES):
+            try:
+                return await self.session.call_tool(name, args)
+            except Exception as e:
+                if attempt == self.MAX_RETRIES - 1:
+                    raise Exception(f"Tool call failed after {self.MAX_RETRIES} attempts: {str(e)}") from e
+                logger.warning("Retrying tool call %s (attempt %d/%d)...", name, attempt + 2, self.MAX_RETRIES)
+                await asyncio.sleep(self.RETRY_DELAY)
+
+    async def save_conversation(self, filename: str, context: Optional[ConversationContext] = None):
+        """Save a conversation history to a file; defaults to the client's own conversation"""
+        if context is None:
+            context = self.context
+        await asyncio.to_thread(self._save_sync, filename, context.history)
+        logger.debug("Conversation saved to %s", filename)
+
+    async def load_conversation(self, filename: str, context: Optional[ConversationContext] = None) -> str:
+        """Load a conversation history from a file; defaults to the client's own conversation
+
+        Returns the time the conversation was saved.
+        """
+        if context is None:
+            context = self.context
+        save_data = await asyncio.to_thread(self._load_sync, filename)
+        context.history = save_data['history']
+        logger.debug("Loaded conversation from %s (saved at %s)", filename, save_data['timestamp'])
+        return save_data['timestamp']
+
+    def _save_sync(self, filename: str, history: list):
+        """Serialize and write a conversation history; runs in a worker thread"""
         save_data = {
-            'history': self.conversation_history,
+            'history': history,
             'timestamp': str(datetime.datetime.now())
         }
-        with open(filename, 'w') as f:
-            json.dump(save_data, f, indent=2)
-        print(f"\nConversation saved to {filename}")
+        with open(filename, 'wb') as f:
+            f.write(orjson.dumps(save_data, default=_json_default, option=orjson.OPT_INDENT_2))
 
-    def load_conversation(self, filename: str):
-        """Load a conversation history from a file"""
-        with open(filename, 'r') as f:
-            save_data = json.load(f)
-        self.conversation_history = save_data['history']
-        print(f"\nLoaded conversation from {filename} (saved at {save_data['timestamp']})")
+    def _load_sync(self, filename: str) -> dict:
+        """Read and parse a saved conversation; runs in a worker thread"""
+        with open(filename, 'rb') as f:
+            return orjson.loads(f.read())
 
     async def chat_loop(self):
         """Run an interactive chat loop"""
@@ -353,7 +551,7 @@ Also when users ask about a website, always assume they are referring to the web
 
         while True:
             try:
-                query = input("\nQuery: ").strip()
+                query = (await ainput("\nQuery: ")).strip()
                 
                 # Handle commands
                 if query.lower() == 'quit':
@@ -363,8 +561,8 @@ Also when users ask about a website, always assume they are referring to the web
                     print("\nConversation history cleared. Starting new conversation.")
                     continue
                 elif query.lower() == 'help':
-                    response = await self.session.list_tools()
-                    tools = response.tools
+                    tools_resp = await self.session.list_tools()
+                    tools = tools_resp.tools
                     print("\nAvailable Tools:")
                     for tool in tools:
                         print(f"\n{tool.name}:")
@@ -379,15 +577,17 @@ Also when users ask about a website, always assume they are referring to the web
                     continue
                 elif query.lower().startswith('save '):
                     filename = query[5:].strip()
-                    self.save_conversation(filename)
+                    await self.save_conversation(filename)
+                    print(f"\nConversation saved to {filename}")
                     continue
                 elif query.lower().startswith('load '):
                     filename = query[5:].strip()
-                    self.load_conversation(filename)
+                    saved_at = await self.load_conversation(filename)
+                    print(f"\nLoaded conversation from {filename} (saved at {saved_at})")
                     continue
 
-                response = await self.process_query(query)
-                print("\n" + response)
+                qresp = await self.process_query(query)
+                print("\n" + qresp)
 
             except Exception as e:
                 print(f"\nError: {str(e)}")
@@ -395,12 +595,14 @@ Also when users ask about a website, always assume they are referring to the web
     async def cleanup(self):
         """Clean up resources"""
         await self.exit_stack.aclose()
+        await self.anthropic.close()
 
 async def main():
     if len(sys.argv) < 2:
         print("Usage: python client.py <path_to_server_script_or_config>")
         sys.exit(1)
 
+    setup_logging()
     client = MCPClient()
     try:
         await client.connect_to_server(sys.argv[1])
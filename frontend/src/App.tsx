@@ -4,6 +4,7 @@ import './App.css'
 interface Message {
   role: 'user' | 'assistant'
   content: string
+  streaming?: boolean
 }
 
 interface Tool {
@@ -29,6 +30,8 @@ interface PromptDetails extends Prompt {
   content: string
 }
 
+const textDecoder = new TextDecoder()
+
 function App() {
   const [messages, setMessages] = useState<Message[]>([])
   const [input, setInput] = useState('')
@@ -50,6 +53,8 @@ function App() {
       console.log('Attempting to connect to WebSocket server')
       
       ws.current = new WebSocket('ws://localhost:8000/ws')
+      // The server sends JSON as binary frames
+      ws.current.binaryType = 'arraybuffer'
 
       ws.current.onopen = () => {
         setIsConnected(true)
@@ -77,32 +82,61 @@ function App() {
       ws.current.onmessage = (event) => {
         console.log('Received message:', event.data)
         try {
-          const data = JSON.parse(event.data)
-          
-          switch (data.type) {
-            case 'initialization':
-              console.log('Received initialization data:', data.data)
-              setTools(data.data.tools)
-              setPrompts(data.data.prompts)
-              break
-            case 'prompt':
-              console.log('Received prompt details:', data.data)
-              setSelectedPrompt(data.data)
-              setShowPromptModal(true)
-              setIsLoading(false)
-              break
-            case 'response':
-              console.log('Received response:', data.data)
-              setMessages(prev => [...prev, { role: 'assistant', content: data.data }])
-              setIsLoading(false)
-              break
-            case 'error':
-              console.error('Received error:', data.data)
-              setConnectionError(data.data)
-              setIsLoading(false)
-              break
-            default:
-              console.warn('Unknown message type:', data.type)
+          const text = typeof event.data === 'string' ? event.data : textDecoder.decode(event.data)
+
+          // The server batches messages into one frame, one JSON message per line
+          for (const line of text.split('\n')) {
+            if (!line) continue
+            const data = JSON.parse(line)
+
+            switch (data.type) {
+              case 'initialization':
+                console.log('Received initialization data:', data.data)
+                setTools(data.data.tools)
+                setPrompts(data.data.prompts)
+                break
+              case 'tools':
+                console.log('Received refreshed tools:', data.data)
+                setTools(data.data)
+                break
+              case 'prompts':
+                console.log('Received refreshed prompts:', data.data)
+                setPrompts(data.data)
+                break
+              case 'prompt':
+                console.log('Received prompt details:', data.data)
+                setSelectedPrompt(data.data)
+                setShowPromptModal(true)
+                setIsLoading(false)
+                break
+              case 'stream':
+                // Append streamed text to the in-progress assistant message
+                setMessages(prev => {
+                  const last = prev[prev.length - 1]
+                  if (last && last.streaming) {
+                    return [...prev.slice(0, -1), { ...last, content: last.content + data.data }]
+                  }
+                  return [...prev, { role: 'assistant', content: data.data, streaming: true }]
+                })
+                break
+              case 'response':
+                console.log('Received response:', data.data)
+                // Replace the streamed draft with the final formatted response
+                setMessages(prev => {
+                  const last = prev[prev.length - 1]
+                  const rest = last && last.streaming ? prev.slice(0, -1) : prev
+                  return [...rest, { role: 'assistant', content: data.data }]
+                })
+                setIsLoading(false)
+                break
+              case 'error':
+                console.error('Received error:', data.data)
+                setConnectionError(data.data)
+                setIsLoading(false)
+                break
+              default:
+                console.warn('Unknown message type:', data.type)
+            }
           }
         } catch (error) {
           console.error('Error parsing message:', error)
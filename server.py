@@ -1,19 +1,137 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.websockets import WebSocketState
-import json
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Optional, Union
+import msgspec
+import orjson
 import asyncio
 import logging
-from client import MCPClient
+import os
+import sys
+from mcp.types import Tool
+from client import MCPClient, ConversationContext, QueryAborted, setup_logging
 
-# Configure logging with more detail
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging; records are written from a background thread. Set LOG_LEVEL=DEBUG for detail.
+setup_logging(getattr(logging, os.environ.get("LOG_LEVEL", "INFO").upper(), logging.INFO))
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+MCP_CONFIG_PATH = "claude_desktop_config.json"
+
+# Seconds an unused shared session stays connected, so reconnects find it warm
+SESSION_IDLE_TIMEOUT = float(os.environ.get("SESSION_IDLE_TIMEOUT", "300"))
+
+@dataclass
+class SharedSession:
+    """A connected MCP client shared by every WebSocket connection using its config"""
+    ready: asyncio.Future  # resolves to the client once connected
+    owner: asyncio.Task  # task that opened the session and will close it
+    stop: asyncio.Event
+    refs: int = 0
+    idle_timer: Optional[asyncio.TimerHandle] = None
+
+# Shared MCP sessions by config path, connected on first use and closed once idle
+sessions: dict[str, SharedSession] = {}
+
+async def _own_session(config_path: str, mcp_client: MCPClient, ready: asyncio.Future, stop: asyncio.Event):
+    """Connect a shared client and keep its MCP session open until stopped
+
+    The session's context managers must be exited by the task that entered them,
+    so each shared client lives in its own task rather than in a WebSocket handler.
+    """
+    try:
+        await mcp_client.connect_to_server(config_path)
+    except asyncio.CancelledError:
+        await mcp_client.cleanup()
+        ready.cancel()
+        raise
+    except Exception as e:
+        await mcp_client.cleanup()
+        ready.set_exception(e)
+        return
+    ready.set_result(mcp_client)
+    logger.info("Connected shared MCP session for %s", config_path)
+    try:
+        await stop.wait()
+    finally:
+        await mcp_client.cleanup()
+        logger.info("Closed shared MCP session for %s", config_path)
+
+def _close_session(config_path: str, shared: SharedSession):
+    """Forget a shared session and stop its owner task"""
+    if sessions.get(config_path) is shared:
+        del sessions[config_path]
+        _init_frame_cache.pop(config_path, None)
+    if shared.idle_timer is not None:
+        shared.idle_timer.cancel()
+    if shared.ready.done():
+        shared.stop.set()
+    else:
+        shared.owner.cancel()
+
+def _close_if_idle(config_path: str, shared: SharedSession):
+    shared.idle_timer = None
+    if shared.refs == 0:
+        _close_session(config_path, shared)
+
+async def acquire_session(config_path: str) -> MCPClient:
+    """Return the shared client for a config, connecting it if it isn't open yet
+
+    Concurrent callers for the same config wait on one connection attempt; no lock
+    is held while connecting, so other configs aren't held up by a slow server.
+    """
+    shared = sessions.get(config_path)
+    if shared is None:
+        ready = asyncio.get_running_loop().create_future()
+        stop = asyncio.Event()
+        owner = asyncio.create_task(_own_session(config_path, MCPClient(), ready, stop))
+        shared = sessions[config_path] = SharedSession(ready, owner, stop)
+    shared.refs += 1
+    if shared.idle_timer is not None:
+        shared.idle_timer.cancel()
+        shared.idle_timer = None
+    try:
+        # Shielded so one cancelled caller doesn't abort the connect for the others
+        return await asyncio.shield(shared.ready)
+    except asyncio.CancelledError:
+        if shared.ready.done() or shared.refs > 1:
+            _release(config_path, shared)
+        else:
+            # Nobody else is waiting for this session; stop connecting
+            shared.refs -= 1
+            _close_session(config_path, shared)
+        raise
+    except Exception:
+        # Connecting failed; drop the session so the next caller retries
+        shared.refs -= 1
+        _close_session(config_path, shared)
+        raise
+
+def release_session(config_path: str):
+    """Drop a reference to a shared client, closing its session after SESSION_IDLE_TIMEOUT unused"""
+    shared = sessions.get(config_path)
+    if shared is not None:
+        _release(config_path, shared)
+
+def _release(config_path: str, shared: SharedSession):
+    shared.refs -= 1
+    if shared.refs == 0:
+        shared.idle_timer = asyncio.get_running_loop().call_later(
+            SESSION_IDLE_TIMEOUT, _close_if_idle, config_path, shared
+        )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Close any shared MCP sessions still open
+    owners = []
+    for config_path, shared in list(sessions.items()):
+        _close_session(config_path, shared)
+        owners.append(shared.owner)
+    await asyncio.gather(*owners, return_exceptions=True)
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS with logging
 origins = ["*"]  # In production, replace with your frontend URL
@@ -25,15 +143,328 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Store active client sessions
-clients = {}
+def encode(payload: dict, default=None) -> bytes:
+    """Encode an outbound message as one newline-terminated line of JSON"""
+    return orjson.dumps(payload, default=default, option=orjson.OPT_APPEND_NEWLINE)
+
+# Constant messages, encoded once
+ERR_INVALID_JSON = encode({"type": "error", "data": "Invalid message format"})
+CLEARED = encode({"type": "cleared"})
+
+# Encoded initialization message per config path; cleared when tools or prompts are refreshed
+_init_frame_cache: dict[str, bytes] = {}
+
+# Per-request HTTP logging is opt-in; uvicorn's access log already covers requests
+if os.environ.get("DEBUG_HTTP"):
+    @app.middleware("http")
+    async def log_requests(request: Request, call_next):
+        logger.info("Incoming %s request to %s", request.method, request.url)
+        response = await call_next(request)
+        logger.info("Returning response with status code %s", response.status_code)
+        return response
+
+async def receive_payload(websocket: WebSocket) -> bytes | str:
+    """Receive one message without Starlette's receive_text/receive_json decoding
+
+    Binary frames come back as bytes and text frames as str; orjson parses either directly.
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    data = message.get("bytes")
+    return data if data is not None else message["text"]
+
+class BatchedSender:
+    """Coalesce outbound JSON messages into one WebSocket frame per event-loop tick
+
+    Messages fed during the same tick are sent as a single binary frame with one
+    message per line (orjson never emits raw newlines). At most one send is in
+    flight; messages fed meanwhile go out together in the next frame. After a
+    failed send the sender is closed and further messages are dropped.
+    """
+    MAX_BATCH = 128  # flush at once with this many queued; drain() waits beyond it
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.queue: list[bytes] = []
+        self.flush_scheduled = False
+        self.closed = False
+        self._sending: Optional[asyncio.Task] = None
+
+    def feed(self, payload: dict):
+        """Queue a message to go out with the current batch"""
+        if not self.closed:
+            self.feed_raw(encode(payload))
+
+    def feed_raw(self, data: bytes):
+        """Queue a message already encoded with encode()"""
+        if self.closed:
+            return
+        self.queue.append(data)
+        # A send in flight flushes the queue itself when it completes
+        if self._sending is not None:
+            return
+        if len(self.queue) >= self.MAX_BATCH:
+            self._flush()
+        elif not self.flush_scheduled:
+            self.flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush)
+
+    async def drain(self):
+        """Wait for the socket while MAX_BATCH or more messages are queued behind a send"""
+        while self._sending is not None and len(self.queue) >= self.MAX_BATCH:
+            # Shielded so a cancelled producer doesn't abort the send
+            await asyncio.shield(self._sending)
+
+    def _flush(self):
+        self.flush_scheduled = False
+        if self.closed or not self.queue or self._sending is not None:
+            return
+        frames, self.queue = self.queue, []
+        self._sending = asyncio.create_task(self._send(frames))
+
+    async def _send(self, frames: list[bytes]):
+        try:
+            await self.websocket.send_bytes(frames[0] if len(frames) == 1 else b"".join(frames))
+        except (WebSocketDisconnect, RuntimeError) as e:
+            logger.warning("Closing sender, send failed: %s", e)
+            self.closed = True
+            self.queue.clear()
+            return
+        finally:
+            self._sending = None
+        # Send whatever was queued while this batch was in flight
+        self._flush()
+
+    async def aclose(self):
+        """Send anything still queued if the socket is open, otherwise drop it"""
+        if not self.closed and self.websocket.client_state == WebSocketState.CONNECTED:
+            self._flush()
+            # Each completed send starts the next until the queue is empty
+            while self._sending is not None:
+                await asyncio.gather(self._sending, return_exceptions=True)
+        else:
+            self.closed = True
+            self.queue.clear()
+            if self._sending is not None:
+                self._sending.cancel()
+
+def _tool_default(obj):
+    """orjson default: encode MCP tools in the shape the frontend expects
+
+    Lets tool lists be serialized in one pass without building intermediate dicts.
+    """
+    if isinstance(obj, Tool):
+        return {
+            "name": obj.name,
+            "description": obj.description,
+            "inputSchema": obj.inputSchema
+        }
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def format_prompts(prompts: list) -> list:
+    """Convert cached MCP prompts to the summary shape the frontend lists"""
+    prompts_list = []
+    for prompt in prompts:
+        try:
+            # Create basic prompt info for the list
+            prompts_list.append({
+                "name": getattr(prompt, 'name', str(prompt)),
+                "description": getattr(prompt, 'description', ''),
+                "parameters": {}  # Parameters will be fetched when prompt is selected
+            })
+        except Exception as e:
+            logger.error("Error processing prompt %s: %s", prompt, e)
+    return prompts_list
+
+def initialization_frame(mcp_client: MCPClient) -> bytes:
+    """Return the encoded initialization message, built once per config
+
+    Every connection on a config shares its session, so the tools and prompts are the same.
+    """
+    frame = _init_frame_cache.get(MCP_CONFIG_PATH)
+    if frame is None:
+        prompts_list = format_prompts(mcp_client._prompts_cache or [])
+        logger.info("Found %d prompts", len(prompts_list))
+        frame = encode({
+            "type": "initialization",
+            "data": {
+                "tools": mcp_client._mcp_tools,
+                "prompts": prompts_list
+            }
+        }, default=_tool_default)
+        _init_frame_cache[MCP_CONFIG_PATH] = frame
+    return frame
+
+# Client -> server messages, tagged by their "type" field
+class Query(msgspec.Struct, tag="query"):
+    content: str
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    logger.info(f"Incoming {request.method} request to {request.url}")
-    response = await call_next(request)
-    logger.info(f"Returning response with status code {response.status_code}")
-    return response
+class GetPrompt(msgspec.Struct, tag="get_prompt"):
+    name: str
+
+class Refresh(msgspec.Struct, tag="refresh"):
+    pass
+
+class RefreshPrompts(msgspec.Struct, tag="refresh_prompts"):
+    pass
+
+class Clear(msgspec.Struct, tag="clear"):
+    pass
+
+class Save(msgspec.Struct, tag="save"):
+    filename: str
+
+class Load(msgspec.Struct, tag="load"):
+    filename: str
+
+ClientMessage = Union[Query, GetPrompt, Refresh, RefreshPrompts, Clear, Save, Load]
+DECODER = msgspec.json.Decoder(ClientMessage)
+
+@dataclass
+class Connection:
+    """Per-WebSocket state handed to the message handlers"""
+    client_id: int
+    websocket: WebSocket
+    sender: BatchedSender
+    mcp_client: MCPClient
+    context: ConversationContext
+    debug: bool  # logger.isEnabledFor(DEBUG), checked once per connection
+
+async def _handle_query(conn: Connection, message: Query):
+    # Process query, streaming text to the client as it arrives
+    if conn.debug:
+        logger.debug("Processing query from %s: %s", conn.client_id, message.content)
+
+    async def send_chunk(chunk: str):
+        sender = conn.sender
+        if sender.closed:
+            # Nobody is listening; stop streaming and calling tools
+            raise QueryAborted("client disconnected")
+        sender.feed({
+            "type": "stream",
+            "data": chunk
+        })
+        # A slow client slows the stream instead of piling up messages
+        await sender.drain()
+
+    qresp = await conn.mcp_client.process_query(message.content, on_text=send_chunk, context=conn.context)
+    conn.sender.feed({
+        "type": "response",
+        "data": qresp
+    })
+    logger.info("Sent query response to %s", conn.client_id)
+
+async def _handle_get_prompt(conn: Connection, message: GetPrompt):
+    # Get prompt details
+    prompt_name = message.name
+    if conn.debug:
+        logger.debug("Fetching prompt %s for %s", prompt_name, conn.client_id)
+    try:
+        # Look up the cached prompt structure to get the parameters
+        selected_prompt = conn.mcp_client._prompts_by_name.get(prompt_name)
+        if not selected_prompt:
+            raise ValueError(f"Prompt {prompt_name} not found")
+        
+        # Extract parameters from the prompt arguments
+        parameters = {}
+        if hasattr(selected_prompt, 'arguments'):
+            for arg in selected_prompt.arguments:
+                parameters[arg.name] = {
+                    "type": "string",
+                    "description": arg.description,
+                    "required": arg.required
+                }
+        
+        # Create prompt details without trying to get content yet
+        prompt_details = {
+            "name": prompt_name,
+            "description": getattr(selected_prompt, 'description', ''),
+            "content": "Please provide the required parameters: " + 
+                     ", ".join(parameters.keys()),
+            "parameters": parameters
+        }
+        
+        if conn.debug:
+            logger.debug("Sending prompt details to frontend: %s", prompt_details)
+        conn.sender.feed({
+            "type": "prompt",
+            "data": prompt_details
+        })
+        logger.info("Sent prompt details to %s", conn.client_id)
+    except Exception as e:
+        error_msg = f"Error fetching prompt: {str(e)}"
+        logger.error(error_msg, exc_info=True)
+        if conn.websocket.client_state != WebSocketState.DISCONNECTED:
+            conn.sender.feed({
+                "type": "error",
+                "data": error_msg
+            })
+
+async def _handle_refresh(conn: Connection, message: Refresh):
+    # Re-fetch the tool list from the MCP server
+    if conn.debug:
+        logger.debug("Refreshing tools for %s", conn.client_id)
+    await conn.mcp_client.refresh_tools()
+    _init_frame_cache.pop(MCP_CONFIG_PATH, None)
+    conn.sender.feed_raw(encode({
+        "type": "tools",
+        "data": conn.mcp_client._mcp_tools
+    }, default=_tool_default))
+    logger.info("Refreshed tools for %s", conn.client_id)
+
+async def _handle_refresh_prompts(conn: Connection, message: RefreshPrompts):
+    # Re-fetch the prompt list from the MCP server
+    if conn.debug:
+        logger.debug("Refreshing prompts for %s", conn.client_id)
+    prompts = await conn.mcp_client.refresh_prompts()
+    _init_frame_cache.pop(MCP_CONFIG_PATH, None)
+    conn.sender.feed({
+        "type": "prompts",
+        "data": format_prompts(prompts)
+    })
+    logger.info("Refreshed prompts for %s", conn.client_id)
+
+async def _handle_clear(conn: Connection, message: Clear):
+    # Clear conversation history
+    if conn.debug:
+        logger.debug("Clearing conversation history for %s", conn.client_id)
+    conn.context.history = []
+    conn.sender.feed_raw(CLEARED)
+    logger.info("Cleared conversation history for %s", conn.client_id)
+
+async def _handle_save(conn: Connection, message: Save):
+    # Save conversation
+    if conn.debug:
+        logger.debug("Saving conversation for %s to %s", conn.client_id, message.filename)
+    await conn.mcp_client.save_conversation(message.filename, conn.context)
+    conn.sender.feed({
+        "type": "saved",
+        "filename": message.filename
+    })
+    logger.info("Saved conversation for %s", conn.client_id)
+
+async def _handle_load(conn: Connection, message: Load):
+    # Load conversation
+    if conn.debug:
+        logger.debug("Loading conversation for %s from %s", conn.client_id, message.filename)
+    await conn.mcp_client.load_conversation(message.filename, conn.context)
+    conn.sender.feed({
+        "type": "loaded",
+        "filename": message.filename
+    })
+    logger.info("Loaded conversation for %s", conn.client_id)
+
+# Message class -> handler
+HANDLERS = {
+    Query: _handle_query,
+    GetPrompt: _handle_get_prompt,
+    Refresh: _handle_refresh,
+    RefreshPrompts: _handle_refresh_prompts,
+    Clear: _handle_clear,
+    Save: _handle_save,
+    Load: _handle_load,
+}
 
 @app.get("/")
 async def root():
@@ -42,211 +473,96 @@ async def root():
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    client_id = str(id(websocket))
-    logger.info(f"New WebSocket connection request from client: {client_id}")
-    logger.debug(f"Client headers: {websocket.headers}")
+    client_id = id(websocket)
+    conn: Optional[Connection] = None
+    _dbg = logger.isEnabledFor(logging.DEBUG)
+    logger.info("New WebSocket connection request from client: %s", client_id)
+    if _dbg:
+        logger.debug("Client headers: %s", websocket.headers)
+    sender = BatchedSender(websocket)
     
     try:
         await websocket.accept()
-        logger.info(f"WebSocket connection accepted for client: {client_id}")
+        logger.info("WebSocket connection accepted for client: %s", client_id)
         
         try:
-            # Initialize MCP client
-            logger.debug(f"Initializing MCP client for {client_id}")
-            mcp_client = MCPClient()
-            await mcp_client.connect_to_server("claude_desktop_config.json")
-            clients[client_id] = mcp_client
-            logger.info(f"MCP client initialized for client: {client_id}")
-
-            # Send initial tools list
-            logger.debug(f"Fetching tools list for {client_id}")
-            tools_response = await mcp_client.session.list_tools()
-            tools = [{
-                "name": tool.name,
-                "description": tool.description,
-                "inputSchema": tool.inputSchema
-            } for tool in tools_response.tools]
-
-            # Fetch available prompts
-            logger.debug(f"Fetching prompts list for {client_id}")
-            try:
-                prompts_result = await mcp_client.session.list_prompts()
-                logger.debug(f"Raw prompts result: {prompts_result}")
-                
-                prompts_list = []
-                for prompt in prompts_result.prompts:
-                    try:
-                        # Get the name from the prompt
-                        prompt_name = getattr(prompt, 'name', str(prompt))
-                        logger.debug(f"Processing prompt: {prompt_name}")
-                        
-                        # Create basic prompt info for the list
-                        prompt_dict = {
-                            "name": prompt_name,
-                            "description": getattr(prompt, 'description', ''),
-                            "parameters": {}  # Parameters will be fetched when prompt is selected
-                        }
-                        prompts_list.append(prompt_dict)
-                    except Exception as e:
-                        logger.error(f"Error processing prompt {prompt}: {str(e)}")
-                        continue
-                        
-                logger.info(f"Found {len(prompts_list)} prompts")
-                logger.debug(f"Final prompts list: {prompts_list}")
-            except Exception as e:
-                logger.warning(f"Failed to fetch prompts: {str(e)}")
-                prompts_list = []
-
-            # Send initial data
-            await websocket.send_json({
-                "type": "initialization",
-                "data": {
-                    "tools": tools,
-                    "prompts": prompts_list
-                }
-            })
-            logger.info(f"Sent initialization data to client: {client_id}")
+            # Join the shared MCP session; the conversation is this connection's own
+            if _dbg:
+                logger.debug("Acquiring MCP session for %s", client_id)
+            mcp_client = await acquire_session(MCP_CONFIG_PATH)
+            # The conversation lives on the connection, not in a global table
+            conn = Connection(client_id, websocket, sender, mcp_client, ConversationContext(), _dbg)
+            logger.info("MCP session acquired for client: %s", client_id)
+
+            # Send initial data, encoded once per config
+            sender.feed_raw(initialization_frame(mcp_client))
+            logger.info("Sent initialization data to client: %s", client_id)
+
+            # Bind hot-loop callables to locals
+            recv = receive_payload
+            decode = DECODER.decode
+            handlers = HANDLERS
 
             while True:
                 try:
-                    if websocket.client_state == WebSocketState.DISCONNECTED:
-                        logger.warning(f"Client disconnected: {client_id}")
-                        break
-
                     # Receive message from client
-                    logger.debug(f"Waiting for message from {client_id}")
-                    data = await websocket.receive_text()
-                    message = json.loads(data)
-                    logger.info(f"Received message from client {client_id}: {message['type']}")
-
-                    if message["type"] == "query":
-                        # Process query
-                        logger.debug(f"Processing query from {client_id}: {message['content']}")
-                        response = await mcp_client.process_query(message["content"])
-                        await websocket.send_json({
-                            "type": "response",
-                            "data": response
-                        })
-                        logger.info(f"Sent query response to {client_id}")
-                    elif message["type"] == "get_prompt":
-                        # Get prompt details
-                        prompt_name = message['name']
-                        logger.debug(f"Fetching prompt {prompt_name} for {client_id}")
-                        try:
-                            # First get the prompt structure to get the parameters
-                            prompts_result = await mcp_client.session.list_prompts()
-                            selected_prompt = None
-                            for prompt in prompts_result.prompts:
-                                if getattr(prompt, 'name', str(prompt)) == prompt_name:
-                                    selected_prompt = prompt
-                                    break
-                            
-                            if not selected_prompt:
-                                raise ValueError(f"Prompt {prompt_name} not found")
-                            
-                            # Extract parameters from the prompt arguments
-                            parameters = {}
-                            if hasattr(selected_prompt, 'arguments'):
-                                for arg in selected_prompt.arguments:
-                                    parameters[arg.name] = {
-                                        "type": "string",
-                                        "description": arg.description,
-                                        "required": arg.required
-                                    }
-                            
-                            # Create prompt details without trying to get content yet
-                            prompt_details = {
-                                "name": prompt_name,
-                                "description": getattr(selected_prompt, 'description', ''),
-                                "content": "Please provide the required parameters: " + 
-                                         ", ".join(parameters.keys()),
-                                "parameters": parameters
-                            }
-                            
-                            logger.debug(f"Sending prompt details to frontend: {prompt_details}")
-                            await websocket.send_json({
-                                "type": "prompt",
-                                "data": prompt_details
-                            })
-                            logger.info(f"Sent prompt details to {client_id}")
-                        except Exception as e:
-                            error_msg = f"Error fetching prompt: {str(e)}"
-                            logger.error(error_msg, exc_info=True)
-                            if websocket.client_state != WebSocketState.DISCONNECTED:
-                                await websocket.send_json({
-                                    "type": "error",
-                                    "data": error_msg
-                                })
-                    elif message["type"] == "clear":
-                        # Clear conversation history
-                        logger.debug(f"Clearing conversation history for {client_id}")
-                        mcp_client.conversation_history = []
-                        await websocket.send_json({
-                            "type": "cleared"
-                        })
-                        logger.info(f"Cleared conversation history for {client_id}")
-                    elif message["type"] == "save":
-                        # Save conversation
-                        logger.debug(f"Saving conversation for {client_id} to {message['filename']}")
-                        mcp_client.save_conversation(message["filename"])
-                        await websocket.send_json({
-                            "type": "saved",
-                            "filename": message["filename"]
-                        })
-                        logger.info(f"Saved conversation for {client_id}")
-                    elif message["type"] == "load":
-                        # Load conversation
-                        logger.debug(f"Loading conversation for {client_id} from {message['filename']}")
-                        mcp_client.load_conversation(message["filename"])
-                        await websocket.send_json({
-                            "type": "loaded",
-                            "filename": message["filename"]
-                        })
-                        logger.info(f"Loaded conversation for {client_id}")
-
-                except json.JSONDecodeError as e:
-                    logger.error(f"Invalid JSON from client {client_id}: {str(e)}")
-                    await websocket.send_json({
+                    if _dbg:
+                        logger.debug("Waiting for message from %s", client_id)
+                    data = await recv(websocket)
+                    message = decode(data)
+                    message_type = type(message)
+                    logger.info("Received message from client %s: %s", client_id, message_type.__name__)
+                    await handlers[message_type](conn, message)
+
+                except msgspec.ValidationError as e:
+                    # Valid JSON, but an unknown type or missing/mistyped fields
+                    logger.error("Invalid message from client %s: %s", client_id, e)
+                    sender.feed({
                         "type": "error",
-                        "data": "Invalid message format"
+                        "data": f"Invalid message: {str(e)}"
                     })
+                except msgspec.DecodeError as e:
+                    logger.error("Invalid JSON from client %s: %s", client_id, e)
+                    sender.feed_raw(ERR_INVALID_JSON)
                 except WebSocketDisconnect:
-                    logger.info(f"WebSocket disconnected for client: {client_id}")
+                    logger.info("WebSocket disconnected for client: %s", client_id)
+                    break
+                except QueryAborted:
+                    logger.info("Abandoned query for disconnected client: %s", client_id)
                     break
                 except Exception as e:
-                    logger.error(f"Error processing message from {client_id}: {str(e)}", exc_info=True)
-                    await websocket.send_json({
+                    logger.error("Error processing message from %s: %s", client_id, e, exc_info=True)
+                    if sender.closed or websocket.client_state != WebSocketState.CONNECTED:
+                        # The send would only raise again; stop serving this connection
+                        break
+                    sender.feed({
                         "type": "error",
                         "data": f"Error processing message: {str(e)}"
                     })
 
         except Exception as e:
-            logger.error(f"Error initializing client {client_id}: {str(e)}", exc_info=True)
-            await websocket.send_json({
-                "type": "error",
-                "data": f"Error initializing client: {str(e)}"
-            })
+            logger.error("Error initializing client %s: %s", client_id, e, exc_info=True)
+            if websocket.client_state == WebSocketState.CONNECTED:
+                sender.feed({
+                    "type": "error",
+                    "data": f"Error initializing client: {str(e)}"
+                })
 
     except WebSocketDisconnect:
-        logger.info(f"WebSocket disconnected during setup for client: {client_id}")
+        logger.info("WebSocket disconnected during setup for client: %s", client_id)
     except Exception as e:
-        logger.error(f"Error in WebSocket connection for client {client_id}: {str(e)}", exc_info=True)
-        try:
-            if websocket.client_state != WebSocketState.DISCONNECTED:
-                await websocket.send_json({
-                    "type": "error",
-                    "data": str(e)
-                })
-        except:
-            logger.error("Failed to send error message to client", exc_info=True)
+        logger.error("Error in WebSocket connection for client %s: %s", client_id, e, exc_info=True)
+        if websocket.client_state != WebSocketState.DISCONNECTED:
+            sender.feed({
+                "type": "error",
+                "data": str(e)
+            })
     finally:
-        if client_id in clients:
-            try:
-                await clients[client_id].cleanup()
-                del clients[client_id]
-                logger.info(f"Cleaned up client: {client_id}")
-            except Exception as e:
-                logger.error(f"Error cleaning up client {client_id}: {str(e)}", exc_info=True)
+        await sender.aclose()
+        if conn is not None:
+            # The session stays up for other connections, and for reconnects while idle
+            release_session(MCP_CONFIG_PATH)
+            logger.info("Released MCP session for client: %s", client_id)
 
 if __name__ == "__main__":
     import uvicorn
@@ -255,6 +571,11 @@ if __name__ == "__main__":
         app,
         host="0.0.0.0",
         port=8000,
-        log_level="debug",
-        ws="wsproto"  # Explicitly use wsproto as the WebSocket backend
-    ) 
\ No newline at end of file
+        log_level="info",
+        ws="websockets",  # C-accelerated framing instead of pure-Python wsproto
+        loop="uvloop" if sys.platform != "win32" else "asyncio",  # uvloop has no Windows support
+        http="httptools",
+        # TLS is terminated by a reverse proxy; trust its X-Forwarded-* headers
+        proxy_headers=True,
+        forwarded_allow_ips=os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1")
+    )